@@ -3,12 +3,12 @@ Database module for Library Management System
 Handles all database operations and connections
 """
 import sqlite3
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime, timedelta
 DATABASE = "library.db"
 
 def get_db_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DATABASE)
+    conn = sqlite3.connect(DATABASE, uri=True)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -196,6 +196,28 @@ def insert_book(title: str, author: str, isbn: str, total_copies: int, available
         return False
 
 
+def insert_book_returning_id(title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> Optional[int]:
+    """
+    Insert a new book and return its id in the same round trip, or None if the insert fails.
+    """
+    conn = get_db_connection()
+    try:
+        book_id = conn.execute(
+            """
+            INSERT INTO books (title, author, isbn, total_copies, available_copies)
+            VALUES (?, ?, ?, ?, ?)
+            RETURNING id
+            """,
+            (title, author, isbn, total_copies, available_copies),
+        ).fetchone()[0]
+        conn.commit()
+        return book_id
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
 def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
     """
     Insert a new borrow record into the database.
@@ -217,6 +239,51 @@ def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, du
         conn.close()
 
 
+def insert_books_bulk(rows: List[Tuple[str, str, str, int, int]]) -> bool:
+    """
+    Insert many books in one transaction.
+    Each row is (title, author, isbn, total_copies, available_copies).
+    """
+    conn = get_db_connection()
+    try:
+        conn.executemany(
+            """
+            INSERT INTO books (title, author, isbn, total_copies, available_copies)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        conn.commit()
+        return True
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.close()
+
+
+def insert_borrow_records_bulk(rows: List[Tuple[str, int, datetime, datetime]]) -> bool:
+    """
+    Insert many borrow records in one transaction.
+    Each row is (patron_id, book_id, borrow_date, due_date).
+    """
+    conn = get_db_connection()
+    try:
+        conn.executemany(
+            """
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+            VALUES (?, ?, ?, ?)
+            """,
+            [(patron_id, book_id, borrow_date.isoformat(), due_date.isoformat())
+             for patron_id, book_id, borrow_date, due_date in rows],
+        )
+        conn.commit()
+        return True
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.close()
+
+
 def update_book_availability(book_id: int, change: int) -> bool:
     """Update the available copies of a book by a given amount (+1 for return, -1 for borrow)."""
     conn = get_db_connection()
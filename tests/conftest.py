@@ -1,4 +1,7 @@
+import sqlite3
 import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
 import pytest
 
@@ -10,17 +13,138 @@ if str(ROOT) not in sys.path:
 # imported after fixing sys.path
 import database
 
+# kept before any fixture patches it so file_db can hand tests the real factory
+REAL_GET_DB_CONNECTION = database.get_db_connection
+
+def memory_db_uri(name: str) -> str:
+    """Return a URI for a named in-memory sqlite db shared by every connection in this process."""
+    return f"file:{name}?mode=memory&cache=shared"
+
+@pytest.fixture(scope="session", autouse=True)
+def session_db():
+    """
+    Point the app at one in-memory db for the whole session and build the tables once.
+    In-memory dbs are private to a process, so each xdist worker gets its own.
+    """
+    uri = memory_db_uri("sqlite_test")
+    # the shared in-memory db lives only as long as one connection holds it open
+    keeper = sqlite3.connect(uri, uri=True)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(database, "DATABASE", uri, raising=False)
+        database.init_database()
+        yield keeper
+    # closing the last connection throws the db away
+    keeper.close()
+
+class RollbackConnection(sqlite3.Connection):
+    """
+    One connection shared by every helper in a test, inside a transaction the test rolls back.
+    Each get_db_connection() call opens a savepoint: commit() releases it and close() without a
+    commit rolls it back, so a helper that fails or forgets to commit still leaves nothing behind.
+    """
+    # Intended trade-off: nothing ever reaches the db for real, so test_database.py covers the
+    # real commit path through file_db. Helpers never nest, so one savepoint at a time is enough.
+    in_helper = False
+
+    def open_helper(self) -> "RollbackConnection":
+        self.execute("SAVEPOINT helper")
+        self.in_helper = True
+        return self
+
+    def commit(self) -> None:
+        if self.in_helper:
+            self.execute("RELEASE helper")
+            self.in_helper = False
+
+    def close(self) -> None:
+        if self.in_helper:
+            self.execute("ROLLBACK TO helper")
+            self.execute("RELEASE helper")
+            self.in_helper = False
+
+@contextmanager
+def rolled_back(uri: str, monkeypatch):
+    """
+    Point the app at a single connection to uri inside one transaction that is rolled back on exit.
+    """
+    # isolation_level=None stops sqlite3 from opening its own transactions around ours
+    conn = sqlite3.connect(uri, uri=True, factory=RollbackConnection, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    monkeypatch.setattr(database, "DATABASE", uri, raising=False)
+    monkeypatch.setattr(database, "get_db_connection", conn.open_helper)
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        try:
+            conn.execute("ROLLBACK")
+        finally:
+            sqlite3.Connection.close(conn)
+
 @pytest.fixture(autouse=True)
-def sandbox_db(tmp_path, monkeypatch):
+def sandbox_db(request, session_db, monkeypatch):
+    """
+    Run every test inside one transaction on a single shared connection and roll it back afterwards.
+    Tests that ask for saturated_patron get that connection on the saturated db instead.
+    """
+    uri = str(database.DATABASE)
+    if "saturated_patron" in request.fixturenames:
+        uri = request.getfixturevalue("saturated_patron_db")
+    with rolled_back(uri, monkeypatch):
+        # sanity check to check tests are using the temp DB
+        assert "mode=memory" in str(database.DATABASE)
+        yield
+
+@pytest.fixture
+def file_db(sandbox_db, tmp_path, monkeypatch):
     """
-    For every test point the app at a throwaway sqlite file and build the tables.
+    Point the app at a fresh on-disk db with the real connection factory, so helpers commit for real.
+    Returns the db path so tests can re-open it on their own connection.
     """
-    db_file = tmp_path / "sqlite_test.db"
+    db_file = tmp_path / "file_test.db"
     monkeypatch.setattr(database, "DATABASE", str(db_file), raising=False)
+    monkeypatch.setattr(database, "get_db_connection", REAL_GET_DB_CONNECTION)
     database.init_database()
+    return db_file
 
-    # sanity check to check tests are using the temp DB
-    assert str(database.DATABASE).endswith("sqlite_test.db")
+# frozen loan dates for stack_loans; the loans are long overdue but still active (no return_date)
+_T0 = datetime(2024, 1, 1, 12, 0, 0)
+_BEGAN = _T0 - timedelta(days=2)
+_DUE = _BEGAN + timedelta(days=14)
+
+def stack_loans(patron_id: str, quota: int):
+    """
+    Give this patron quota active loans (no return_date), batched into one insert per table.
+    """
+    books = [(f"Foundation Vol.{i}", "Isaac Asimov", f"9791{i:09d}", 1, 1) for i in range(quota)]
+    assert database.insert_books_bulk(books), "stack_loans could not insert its books."
+    book_pks = {book["isbn"]: book["id"] for book in database.get_all_books()}
+    assert database.insert_borrow_records_bulk(
+        [(patron_id, book_pks[isbn], _BEGAN, _DUE) for _, _, isbn, _, _ in books]
+    ), "stack_loans could not insert its borrow records."
 
-    # tmp_path is cleaned by pytest
-    yield
+SATURATED_PATRON = "703981"
+
+@pytest.fixture(scope="session")
+def saturated_patron_db(session_db):
+    """
+    Build once per session a db where SATURATED_PATRON already holds five active loans.
+    """
+    uri = memory_db_uri("saturated")
+    keeper = sqlite3.connect(uri, uri=True)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(database, "DATABASE", uri, raising=False)
+        # build through the real factory even if a sandbox has already patched it
+        mp.setattr(database, "get_db_connection", REAL_GET_DB_CONNECTION)
+        database.init_database()
+        stack_loans(SATURATED_PATRON, 5)
+    yield uri
+    keeper.close()
+
+@pytest.fixture
+def saturated_patron():
+    """
+    Return the patron who is at the loan limit; sandbox_db sees this fixture and runs the test on the saturated db.
+    Rolling back keeps the cached loans intact for the next test that asks for them.
+    """
+    return SATURATED_PATRON
@@ -0,0 +1,65 @@
+# Direct tests for database.py helpers on a real on-disk db (no rollback connection)
+import sqlite3
+from datetime import datetime, timedelta
+from database import (
+    get_all_books,
+    insert_book_returning_id,
+    insert_books_bulk,
+    insert_borrow_records_bulk,
+)
+
+def read_rows(db_file, sql: str):
+    """Read rows on a separate connection so only committed data is visible."""
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+def test_insert_book_returning_id_commits(file_db):
+    """
+    Positive: the returned id matches the committed row another connection can see.
+    """
+    book_id = insert_book_returning_id("Dune", "Frank Herbert", "9780441172719", 2, 2)
+    assert book_id is not None
+    assert read_rows(file_db, "SELECT id, isbn FROM books") == [(book_id, "9780441172719")]
+
+def test_insert_book_returning_id_duplicate_isbn(file_db):
+    """
+    Negative: a duplicate ISBN returns None and leaves only the first row.
+    """
+    assert insert_book_returning_id("Dune", "Frank Herbert", "9780441172719", 2, 2) is not None
+    assert insert_book_returning_id("Dune Again", "Frank Herbert", "9780441172719", 1, 1) is None
+    assert read_rows(file_db, "SELECT COUNT(*) FROM books") == [(1,)]
+
+def test_bulk_inserts_commit(file_db):
+    """
+    Positive: both bulk helpers commit every row in one go.
+    """
+    books = [("Emma", "Jane Austen", "9780141439587", 1, 1), ("Persuasion", "Jane Austen", "9780141439686", 1, 1)]
+    assert insert_books_bulk(books) is True
+    book_ids = [row[0] for row in read_rows(file_db, "SELECT id FROM books ORDER BY id")]
+    assert len(book_ids) == 2
+
+    began_at = datetime(2024, 1, 1, 12, 0, 0)
+    due_on = began_at + timedelta(days=14)
+    assert insert_borrow_records_bulk([("112233", book_id, began_at, due_on) for book_id in book_ids]) is True
+    assert read_rows(file_db, "SELECT patron_id, book_id, due_date FROM borrow_records ORDER BY book_id") == [
+        ("112233", book_id, due_on.isoformat()) for book_id in book_ids
+    ]
+
+def test_insert_books_bulk_rolls_back_on_error(file_db):
+    """
+    Negative: a duplicate ISBN inside the batch fails the whole batch and nothing is committed.
+    """
+    books = [("Emma", "Jane Austen", "9780141439587", 1, 1), ("Emma Twice", "Jane Austen", "9780141439587", 1, 1)]
+    assert insert_books_bulk(books) is False
+    assert read_rows(file_db, "SELECT COUNT(*) FROM books") == [(0,)]
+
+def test_failed_bulk_insert_leaves_nothing_in_sandbox():
+    """
+    Negative: inside the rolled-back sandbox a failed batch is dropped just like on a real db.
+    """
+    books = [("Emma", "Jane Austen", "9780141439587", 1, 1), ("Emma Twice", "Jane Austen", "9780141439587", 1, 1)]
+    assert insert_books_bulk(books) is False
+    assert get_all_books() == []
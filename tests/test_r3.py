@@ -1,38 +1,20 @@
-import pytest
-from datetime import datetime, timedelta
+from services import library_service as LS
 from services.library_service import borrow_book_by_patron
 
 # Minimal DB helpers used to inspect state
 from database import (
-    insert_book,
+    insert_book_returning_id,
     get_book_by_id,
-    get_book_by_isbn,
     get_patron_borrow_count,
-    insert_borrow_record,
 )
 
 def mint_book(*, title: str, author: str, isbn: str, total: int, avail: int) -> int:
     """
     Insert a book and return its DB id.
     """
-    insert_book(title, author, isbn, total, avail)
-    return get_book_by_isbn(isbn)["id"]
-
-def stack_loans(patron_id: str, quota: int):
-    """
-    Give this patron quota active loans (no return_date).
-    """
-    for i in range(quota):
-        book_pk = mint_book(
-            title=f"Foundation Vol.{i}",
-            author="Isaac Asimov",
-            isbn=f"9791{i:09d}",
-            total=1,
-            avail=1,
-        )
-        began_at = datetime.now() - timedelta(days=2)
-        due_on = began_at + timedelta(days=14)
-        insert_borrow_record(patron_id, book_pk, began_at, due_on)
+    book_pk = insert_book_returning_id(title, author, isbn, total, avail)
+    assert book_pk is not None, f"mint_book could not insert {isbn}."
+    return book_pk
 
 def test_borrow_happy_path_drops_stock():
     """
@@ -46,7 +28,8 @@ def test_borrow_happy_path_drops_stock():
         total=3,
         avail=3,
     )
-    avail_before = get_book_by_id(book_pk)["available_copies"]
+    # minted with avail=3 so there is no need to read it back
+    avail_before = 3
     ok, msg = borrow_book_by_patron(card, book_pk)
     avail_after = get_book_by_id(book_pk)["available_copies"]
     assert ok is True, "This borrow should go through."
@@ -54,47 +37,45 @@ def test_borrow_happy_path_drops_stock():
     assert avail_after == avail_before - 1, "Stock should drop by exactly one."
     assert get_patron_borrow_count(card) == 1, "Patron’s active count should tick up."
 
-@pytest.mark.parametrize("bad_patron", ["", "12345", "1234567", "12A456", "abcdef", " 123456 "])
-def test_reject_bad_patron_format(bad_patron):
+def test_reject_bad_patron_format(mocker, subtests):
     """
     Negative: patron ID must be exactly six digits.
     """
-    book_pk = mint_book(
-        title="Pride and Prejudice",
-        author="Jane Austen",
-        isbn="9780141439518",
-        total=1,
-        avail=1,
+    # validation happens before the lookup so the book never needs to exist
+    book_lookup_stub = mocker.patch.object(
+        LS, "get_book_by_id",
+        return_value={"id": 1, "available_copies": 1, "title": "Pride and Prejudice"},
     )
-    ok, msg = borrow_book_by_patron(bad_patron, book_pk)
-    assert ok is False
-    assert "invalid patron id" in (msg or "").lower()
+    for bad_patron in ["", "12345", "1234567", "12A456", "abcdef", " 123456 "]:
+        with subtests.test(patron=bad_patron):
+            ok, msg = borrow_book_by_patron(bad_patron, 1)
+            assert ok is False
+            assert "invalid patron id" in (msg or "").lower()
+    book_lookup_stub.assert_not_called()
 
-def test_reject_when_zero_stock():
+def test_reject_when_zero_stock(mocker):
     """
     Negative, book exists but availability is 0 then borrow is refused and stock unchanged
     """
     card = "135790"
-    book_pk = mint_book(
-        title="One Hundred Years of Solitude",
-        author="Gabriel García Márquez",
-        isbn="9780060883287",
-        total=1,
-        avail=0,
+    book_lookup_stub = mocker.patch.object(
+        LS, "get_book_by_id",
+        return_value={"id": 1, "available_copies": 0, "title": "One Hundred Years of Solitude"},
     )
-    avail_before = get_book_by_id(book_pk)["available_copies"]
-    ok, msg = borrow_book_by_patron(card, book_pk)
-    avail_after = get_book_by_id(book_pk)["available_copies"]
+    stock_stub = mocker.patch.object(LS, "update_book_availability")
+    ok, msg = borrow_book_by_patron(card, 1)
     assert ok is False
     assert "not available" in (msg or "").lower()
-    assert avail_after == avail_before == 0, "Should stay at zero when the borrow is denied."
+    book_lookup_stub.assert_called_once_with(1)
+    stock_stub.assert_not_called()
+    assert get_patron_borrow_count(card) == 0, "No loan should be recorded when the borrow is denied."
 
-def test_reject_over_five_active():
+def test_reject_over_five_active(saturated_patron):
     """
     Negative: patrons can carry at most five active loans the sixth must be refused
     """
-    card = "703981"
-    stack_loans(card, 5)
+    card = saturated_patron
+    assert get_patron_borrow_count(card) == 5
     book_pk = mint_book(
         title="Beloved",
         author="Toni Morrison",